@@ -0,0 +1,154 @@
+# Benchmarks the exact and Monte Carlo engines across scales of w_log, depth and fraction of dishonest miners, reporting wall time, peak memory and rate,
+# and checks that each Monte Carlo estimate agrees with the exact result within its confidence interval (exits with status 1 if any does not);
+# ends with how many times as fast the numpy engine is as the block-by-block python engine
+# Usage: python3 benchmark.py
+#        python3 benchmark.py -s large -c 0.9999
+
+import sys
+import time
+import argparse
+import tracemalloc
+from statistics import NormalDist
+import fdts
+
+SCALES = {                                                      # sizes of benchmark cases at each scale
+    'small': {'depths': [100, 1000], 'w_logs': [3, 4, 5],
+              'monte_fracs': [0.25, 0.40], 'monte_depths': [5, 20], 'monte_w_logs': [1, 2],
+              'numpy_trials': 100000, 'python_blocks': 3000000, 'curve_trials': 50000},
+    'large': {'depths': [100, 1000, 10000], 'w_logs': [3, 4, 5, 6, 7],
+              'monte_fracs': [0.10, 0.25, 0.40], 'monte_depths': [5, 20, 100], 'monte_w_logs': [1, 2, 3, 4],
+              'numpy_trials': 2000000, 'python_blocks': 30000000, 'curve_trials': 1000000},
+}
+FRACS = [0.10, 0.25, 0.45]                                      # fractions of dishonest miners used for exact cases
+SWEEP_FRACS = fdts.parse_range('0.01:0.49:0.01', float)         # fractions of dishonest miners used for sweep cases
+CURVE_MIN_DEPTH = 5                                             # smallest depth checked in depth curves; the exact result assumes a pre-mine long enough for
+                                                                # its lead to be stationary, but PREMINE_FACTOR*depth blocks are too few below this (at q=0.40
+                                                                # and depth 2, the difference is about 1.8 standard errors with 1000000 trials)
+
+def measure(func):                                              # returns result of func(), wall time in seconds of an untraced call, and peak traced memory in bytes of a second call
+    start_time = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start_time
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak
+
+class Benchmark(object):                                        # runs benchmark cases and prints one row per case
+    def __init__(self,
+                 confidence,                                    # confidence level of intervals used for accuracy checks
+                 seed):                                         # seed of every Monte Carlo case
+        self.confidence = confidence
+        self.z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        self.seed = seed
+        self.failures = 0
+        self.speedups = []                                      # ratios of rate of numpy engine to rate of block-by-block engine, one per case
+        print(f'{"case":<22s} {"params":<28s} {"seconds":>9s} {"peak_MiB":>9s} {"rate":>11s} {"unit":<10s} {"estimate":>12s} {"exact":>12s} {"check":>5s}')
+
+    def report(self, case, params, seconds, peak, count, unit, estimate=None, exact=None, ok=None):
+        if (ok is not None) and (not ok):
+            self.failures += 1
+        estimate_text = f'{estimate:12.5e}' if estimate is not None else f'{"-":>12s}'
+        exact_text = f'{exact:12.5e}' if exact is not None else f'{"-":>12s}'
+        check_text = '-' if ok is None else ('ok' if ok else 'FAIL')
+        print(f'{case:<22s} {params:<28s} {seconds:9.3f} {peak / 2 ** 20:9.2f} {count / max(seconds, 1e-9):11.4e} {unit:<10s} {estimate_text} {exact_text} {check_text:>5s}')
+        sys.stdout.flush()
+
+    def run_exact(self, scale):                                 # times exact engines, both one value at a time and for all values at once
+        for depth in scale['depths']:
+            for frac in FRACS:
+                params = f'q={frac:.2f} depth={depth}'
+                _, seconds, peak = measure(lambda: fdts.DoubleSpend(depth, frac).calc_all_double_spends())
+                self.report('double_spend_all', params, seconds, peak, depth, 'depths/s')
+                _, seconds, peak = measure(lambda: fdts.DoubleSpend(depth, frac).calc_log_double_spend(depth))
+                self.report('double_spend_log', params, seconds, peak, 1, 'calls/s')
+            params = f'{len(SWEEP_FRACS)} fracs depth<={depth}'
+            _, seconds, peak = measure(lambda: fdts.DoubleSpendSweep(depth, SWEEP_FRACS, fdts.LogFactorials(2 * depth)).calc_all_double_spends())
+            self.report('double_spend_sweep', params, seconds, peak, depth * len(SWEEP_FRACS), 'values/s')
+        for w_log in scale['w_logs']:
+            w = 4 ** w_log
+            for frac in FRACS:
+                params = f'q={frac:.2f} w_log={w_log}'
+                _, seconds, peak = measure(lambda: fdts.Window(w_log, frac).calc_all_few_honest_probs())
+                self.report('window_all', params, seconds, peak, w, 'bs/s')
+                _, seconds, peak = measure(lambda: fdts.Window(w_log, frac).calc_log_few_honest_prob(w // 4))
+                self.report('window_log', params, seconds, peak, 1, 'calls/s')
+            params = f'{len(SWEEP_FRACS)} fracs w_log={w_log}'
+            _, seconds, peak = measure(lambda: fdts.WindowSweep(w_log, SWEEP_FRACS, fdts.LogFactorials(2 * w)).calc_all_few_honest_probs())
+            self.report('window_sweep', params, seconds, peak, w * len(SWEEP_FRACS), 'values/s')
+
+    def check_race(self, case, params, race, exact, trials):    # runs Monte Carlo race, checks exact value lies within its interval and returns trials per second
+        (total, squares), seconds, peak = measure(lambda: race.run(trials, self.seed))
+        low, high = race.interval(total, squares, trials, self.z)
+        self.report(case, params, seconds, peak, trials, 'trials/s', total / trials, exact, low <= exact <= high)
+        return trials / max(seconds, 1e-9)
+
+    def check_curve(self, race, successes, exacts, trials):     # returns whether every exact value of a curve lies within its interval
+        z = NormalDist().inv_cdf(1 - (1 - self.confidence) / (2 * len(exacts)))
+                                                                # every point is checked, so each uses a Bonferroni-corrected level
+        intervals = [race.interval(count, count, trials, z) for count in successes]
+        return all(low <= exact <= high for exact, (low, high) in zip(exacts, intervals))
+
+    def run_monte(self, scale):                                 # times Monte Carlo engines and checks their estimates against exact engines, across depth, w_log and q
+        premine_factor = fdts.PREMINE_FACTOR
+        for frac in scale['monte_fracs']:
+            for depth in scale['monte_depths']:
+                exact = fdts.DoubleSpend(depth, frac).calc_double_spend(depth)
+                params = f'q={frac:.2f} depth={depth}'
+                rate = self.check_race('double_spend_numpy', params, fdts.BlockRace(frac, premine_factor * depth, depth, 0), exact, scale['numpy_trials'])
+                self.check_race('double_spend_tilted', params, fdts.TiltedBlockRace(frac, premine_factor * depth, depth, 0), exact, scale['numpy_trials'])
+                trials = self.python_trials(scale, (2 * premine_factor + 1) * depth)
+                successes, seconds, peak = measure(lambda: fdts.double_spend_trials(frac, premine_factor * depth, depth, trials, self.seed))
+                low, high = fdts.BlockRace(frac, 0, depth, 0).interval(successes, successes, trials, self.z)
+                self.report('double_spend_python', params, seconds, peak, trials, 'trials/s', successes / trials, exact, low <= exact <= high)
+                self.speedups.append(rate * seconds / trials)
+            max_depth = max(scale['monte_depths'])
+            race = fdts.DepthCurveRace(frac, premine_factor, max_depth)
+            trials = scale['curve_trials']
+            (successes, _), seconds, peak = measure(lambda: race.run(trials, self.seed))
+            exacts = fdts.DoubleSpend(max_depth, frac).calc_all_double_spends()
+            ok = self.check_curve(race, successes[CURVE_MIN_DEPTH - 1:], exacts[CURVE_MIN_DEPTH - 1:], trials)
+            self.report('double_spend_curve', f'q={frac:.2f} depth<={max_depth}', seconds, peak, trials, 'trials/s', successes[-1] / trials, exacts[-1], ok)
+            for w_log in scale['monte_w_logs']:
+                w = 4 ** w_log
+                window = fdts.Window(w_log, frac)
+                for b in sorted({1, max(1, w // 4)}):
+                    exact = window.calc_few_honest_prob(b)
+                    params = f'q={frac:.2f} w_log={w_log} b={b}'
+                    rate = self.check_race('window_numpy', params, fdts.BlockRace(frac, premine_factor * w, w, b - 1), exact, scale['numpy_trials'])
+                    self.check_race('window_tilted', params, fdts.TiltedBlockRace(frac, premine_factor * w, w, b - 1), exact, scale['numpy_trials'])
+                    trials = self.python_trials(scale, (2 * premine_factor + 1) * w)
+                    successes, seconds, peak = measure(lambda: fdts.window_trials(frac, premine_factor * w, w, b, trials, self.seed))
+                    low, high = fdts.BlockRace(frac, 0, w, b - 1).interval(successes, successes, trials, self.z)
+                    self.report('window_python', params, seconds, peak, trials, 'trials/s', successes / trials, exact, low <= exact <= high)
+                    self.speedups.append(rate * seconds / trials)
+            w_log = max(scale['monte_w_logs'])
+            w = 4 ** w_log
+            race = fdts.WindowCurveRace(frac, premine_factor * w, w)
+            trials = scale['curve_trials']
+            (successes, _), seconds, peak = measure(lambda: race.run(trials, self.seed))
+            exacts = fdts.Window(w_log, frac).calc_all_few_honest_probs()
+            ok = self.check_curve(race, successes, exacts, trials)
+            self.report('window_curve', f'q={frac:.2f} w_log={w_log} b<={w}', seconds, peak, trials, 'trials/s', successes[0] / trials, exacts[0], ok)
+        print(f'numpy engine is {min(self.speedups):.0f}x to {max(self.speedups):.0f}x as fast as python engine (trials/s, same case)')
+
+    def python_trials(self, scale, honest_blocks):              # returns number of trials of block-by-block engine, so each case simulates about the same number of blocks
+        return max(1000, scale['python_blocks'] // honest_blocks)
+
+
+# Main program
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark exact and Monte Carlo engines and check Monte Carlo estimates against exact results')
+    parser.add_argument('-s', dest='scale', default='small', choices=sorted(SCALES), help='size of benchmark cases (default: small)')
+    parser.add_argument('-c', dest='confidence', default='0.999', help='confidence level of intervals used for accuracy checks (default: 0.999)')
+    parser.add_argument('--seed', dest='seed', default='1', help='random seed of Monte Carlo cases (default: 1)')
+    parser.add_argument('--exact-only', dest='exact_only', action='store_true', help='skip Monte Carlo cases')
+    args = parser.parse_args()
+    benchmark = Benchmark(float(args.confidence), int(args.seed))
+    benchmark.run_exact(SCALES[args.scale])
+    if (not args.exact_only):
+        benchmark.run_monte(SCALES[args.scale])
+    if (benchmark.failures > 0):
+        print(f'{benchmark.failures} Monte Carlo estimate(s) disagree with exact results')
+        sys.exit(1)
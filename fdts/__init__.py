@@ -0,0 +1,32 @@
+# Exact analysis and Monte Carlo simulation of the risk of double spend and FDT attacks
+# Importing has no side effects; modules that need numpy are only loaded when one of their names is first used
+
+import importlib
+from fdts.binomial import Binomial
+from fdts.double_spend import DoubleSpend
+from fdts.window import Window
+from fdts.solve import parse_log_eps, min_safe_depth, max_safe_b
+
+LAZY_NAMES = {                                                  # maps each name that needs numpy to the module defining it
+    'LogFactorials': 'fdts.sweep',
+    'DoubleSpendSweep': 'fdts.sweep',
+    'WindowSweep': 'fdts.sweep',
+    'parse_range': 'fdts.sweep',
+    'PREMINE_FACTOR': 'fdts.monte_engine',
+    'BlockRace': 'fdts.monte_engine',
+    'TiltedBlockRace': 'fdts.monte_engine',
+    'DepthCurveRace': 'fdts.monte_engine',
+    'WindowCurveRace': 'fdts.monte_engine',
+    'relative_error': 'fdts.monte_engine',
+    'double_spend_trials': 'fdts.monte_loop',
+    'window_trials': 'fdts.monte_loop',
+}
+
+__all__ = ['Binomial', 'DoubleSpend', 'Window', 'parse_log_eps', 'min_safe_depth', 'max_safe_b'] + list(LAZY_NAMES)
+
+def __getattr__(name):                                          # loads module defining "name" on first use
+    if (name not in LAZY_NAMES):
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(LAZY_NAMES[name]), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,86 @@
+# Binomial distribution probabilities, shared by the exact analyses in double_spend.py and window.py
+# NumPy is only imported by the array methods, so the scalar methods work without it
+
+import math
+
+TAIL = 1e-30                                                    # terms below this fraction of the largest term are negligible
+
+class Binomial(object):                                         # calculates binomial distribution probabilities
+    def __init__(self,
+                 prob,                                          # probability of success per trial
+                 max_trials):                                   # maximum number of trials
+      self.prob = prob
+      self.max_trials = max_trials
+      self.fail = 1.0 - self.prob                               # probability of failure per trial
+      self.log_prob = math.log(self.prob) if self.prob > 0.0 else -math.inf
+      self.log_fail = math.log(self.fail) if self.fail > 0.0 else -math.inf
+                                                                # values are computed on demand in log space, so no table of values is stored
+      self.log_factorials = None                                # log(n!) for n <= max_trials, built on first call to get_log_values
+
+    def get_log_value(self, successes, trials):                 # return natural log of probability of given number of successes for given number of trials
+        assert 0 <= successes <= trials
+        assert trials <= self.max_trials
+        failures = trials - successes
+        log_value = math.lgamma(trials + 1) - math.lgamma(successes + 1) - math.lgamma(failures + 1)
+        if (successes > 0):
+            log_value += successes * self.log_prob
+        if (failures > 0):
+            log_value += failures * self.log_fail
+        return log_value
+
+    def get_value(self, successes, trials):                     # return probability of given number of successes for given number of trials
+        return math.exp(self.get_log_value(successes, trials))
+
+    def build_log_factorials(self):                             # build table of log(n!) used by get_log_values, if not yet built
+        import numpy as np
+        if (self.log_factorials is None):
+            self.log_factorials = np.array([math.lgamma(n + 1) for n in range(self.max_trials + 1)])
+
+    def get_log_values(self, successes, trials):                # return array of natural logs of probabilities for arrays of numbers of successes and trials
+        import numpy as np
+        successes = np.asarray(successes)
+        trials = np.asarray(trials)
+        assert np.all((0 <= successes) & (successes <= trials))
+        assert np.all(trials <= self.max_trials)
+        self.build_log_factorials()
+        failures = trials - successes
+        log_values = self.log_factorials[trials] - self.log_factorials[successes] - self.log_factorials[failures]
+        with np.errstate(invalid='ignore'):                     # 0 * log(0) terms are dropped below
+            log_values += np.where(successes > 0, successes * self.log_prob, 0.0)
+            log_values += np.where(failures > 0, failures * self.log_fail, 0.0)
+        return log_values
+
+def log_sum_exp(log_terms, signs):                              # return natural log of sum of signs * exp(log_terms), or -inf if sum is not positive (log of a negative sum is undefined)
+    import numpy as np
+    top = np.max(log_terms)
+    if (top == -math.inf):
+        return -math.inf
+    total = np.sum(signs * np.exp(log_terms - top))
+    return top + math.log(total) if total > 0.0 else -math.inf
+
+def sum_series(log_top,                                         # natural log of largest term
+               top,                                             # index of largest term
+               first,                                           # index of first term
+               last,                                            # index of last term
+               ratio,                                           # ratio(k) gives term(k + 1) / term(k)
+               weight):                                         # weight(k) gives factor by which term(k) is multiplied
+                                                                # return sum of term(k) * weight(k) for first <= k <= last
+    # Terms are found from their neighbours relative to the largest term, walking outward from "top" in both directions,
+    # so none underflows and each costs one multiplication.  As the terms are unimodal, each direction stops once they
+    # fall below TAIL of the largest term, so for n terms only about sqrt(n) are visited.
+    total = weight(top)
+    term = 1.0
+    for k in range(top, last):
+        term *= ratio(k)
+        if (term < TAIL):
+            break
+        total += term * weight(k + 1)
+    term = 1.0
+    for k in range(top - 1, first - 1, -1):
+        term /= ratio(k)
+        if (term < TAIL):
+            break
+        total += term * weight(k)
+    if (total == 0.0):
+        return 0.0
+    return math.copysign(math.exp(log_top + math.log(abs(total))), total)
@@ -0,0 +1,67 @@
+# Calculates risk of a bitcoin payment being double spent based on its depth in the blockchain and the fraction of dishonest miner hashpower, with premining, assuming payment time is controlled by honest party
+
+import math
+from fdts.binomial import Binomial, log_sum_exp, sum_series
+
+class DoubleSpend(object):                                      # calculates probability of a double spend given depth and fraction of dishonest miners
+    def __init__(self,
+                 max_depth,                                     # maximum depth of spend attempting to be double spent
+                 dishonest_frac):                               # fraction of miners that are dishonest
+        self.max_depth = max_depth
+        self.dishonest_frac = dishonest_frac
+        self.honest_frac = 1.0 - dishonest_frac
+        self.ratio = self.dishonest_frac / self.honest_frac     # ratio of dishonest to honest hashpower; is q/p value in gambler's ruin problem
+        self.binomial = Binomial(self.honest_frac, 2*max_depth) # calculates probability of each number of honest blocks mined within first 2*max_depth blocks
+
+    def calc_double_spend(self,                                 # calculates probability of given spend being double spent given its depth
+                         depth):                                # depth of spend attempting to be double spent
+        if (self.dishonest_frac == 0.0):
+            return 0.0
+        # node_prob for k dishonest blocks mined when depth honest blocks are first mined (ignoring pre-mine) is
+        # (depth-1+k choose k) * p^k * q^(depth-1) * q, so node_prob(k + 1) / node_prob(k) = p * (depth+k) / (k+1),
+        # and the largest node_prob is at k = p * (depth-1) / q
+        top = min(int(self.honest_frac * (depth - 1) / self.dishonest_frac), depth - 1)
+        log_top = self.binomial.get_log_value(top, depth - 1 + top) + math.log(self.dishonest_frac)
+        premine_prob = sum_series(log_top, top, 0, depth - 1,
+                                  lambda k: self.honest_frac * (depth + k) / (k + 1),
+                                  lambda k: 2.0 + (depth - k) * (self.ratio - self.ratio ** 2))
+                                                                # probability of successful double spend attack (including pre-mining)
+        return premine_prob
+
+    def calc_log_double_spend(self,                             # log-domain version of calc_double_spend, which does not underflow
+                              depth):                           # depth of spend attempting to be double spent
+                                                                # returns probability and its natural log; only valid for q < p, as for q >= p the
+                                                                # formula is outside the model's range and its sum may be negative, which gives (0.0, -inf)
+        import numpy as np
+        if (self.dishonest_frac == 0.0):
+            return 0.0, -math.inf
+        k = np.arange(depth)
+        deficit = depth - k
+        premine_case_probs = 2.0 + deficit * self.ratio - deficit * (self.ratio ** 2)
+                                                                # can be negative when q > p
+        with np.errstate(divide='ignore'):
+            log_terms = (self.binomial.get_log_values(k, depth - 1 + k) + math.log(self.dishonest_frac)
+                         + np.log(np.abs(premine_case_probs)))
+        log_prob = log_sum_exp(log_terms, np.sign(premine_case_probs))
+        return math.exp(log_prob), log_prob
+
+    def calc_all_double_spends(self):                           # calculates probability of a double spend for every depth from 1 to max_depth in a single pass
+                                                                # returns list whose element "depth - 1" is probability for "depth"
+        # prob(depth) = 2 * node_sum(depth) + (ratio - ratio^2) * deficit_sum(depth), where node_sum is the sum of node_prob and
+        # deficit_sum is the sum of deficit * node_prob over k in calc_double_spend.  Both sums are found directly for max_depth,
+        # then for each smaller depth by adding a positive multiple of central(depth) = (2*depth-1 choose depth) * (p*q)^depth,
+        # so no precision is lost to cancellation.
+        node_sum = 0.0                                          # sum of node_prob for current depth
+        deficit_sum = 0.0                                       # sum of deficit * node_prob for current depth
+        for k in range(self.max_depth):
+            node_prob = self.binomial.get_value(k, self.max_depth - 1 + k) * self.dishonest_frac
+            node_sum += node_prob
+            deficit_sum += (self.max_depth - k) * node_prob
+        probs = [0.0] * self.max_depth
+        for depth in range(self.max_depth, 0, -1):
+            if (depth < self.max_depth):
+                central = self.binomial.get_value(depth - 1, 2 * depth - 1) * self.honest_frac
+                node_sum += (self.honest_frac - self.dishonest_frac) * central
+                deficit_sum = depth * (deficit_sum + 2.0 * self.honest_frac * central) / (depth + 1)
+            probs[depth - 1] = 2.0 * node_sum + (self.ratio - self.ratio ** 2) * deficit_sum
+        return probs
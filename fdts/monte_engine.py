@@ -0,0 +1,342 @@
+# Vectorized Monte Carlo engine used by monte_window.py and monte_double_spend.py
+# Simulates many trials at once as NumPy arrays, with the same semantics as the block-by-block loops in fdts.monte_loop
+#
+# Each honest block is preceded by a geometrically-distributed number of dishonest blocks, so a trial is simulated by drawing
+# one count per honest block.  Within a phase, the dishonest lead (dishonest_block - honest_block) after each honest block is
+# a cumulative sum of those counts, and the "dishonest_block = honest_block" resets are recovered from its running minimum.
+#
+# The pre-mine and post periods are 2*PREMINE_FACTOR times longer than the target period, but neither depends on the trial:
+# the pre-mine lead is a random walk reflected at 0, and the post period only matters through the highest lead it adds.  When
+# q < p, prepare() tabulates the exact distribution of both by dynamic programming over honest blocks, and each trial then
+# draws each of them with a single uniform, so only the target period is simulated block by block.
+
+import math
+import time
+import numpy as np
+from statistics import NormalDist
+from concurrent.futures import ProcessPoolExecutor
+
+PREMINE_FACTOR = 30                                             # number of multiples of "w" or "depth" honest blocks mined during pre-mine period and post period
+BATCH_TRIALS = 1 << 16                                          # maximum number of trials simulated at once; also number of trials per shard
+BATCH_VALUES = 1 << 22                                          # maximum number of block counts held in memory at once
+TAIL_BITS = 64                                                  # leads are tabulated until any trial reaching beyond the table has probability below 2**-TAIL_BITS
+
+def relative_error(total, squares, trials):                     # returns relative standard error of mean estimate, given sum and sum of squares of per-trial estimates
+    if (total <= 0):
+        return math.inf
+    mean = total / trials
+    return math.sqrt(max(squares / trials - mean ** 2, 0.0) / trials) / mean
+
+class BlockRace(object):                                        # simulates races between honest and dishonest miners around a target period
+    phases = ('premine', 'target', 'post')                      # phases whose seconds are returned by run_shard
+
+    def __init__(self,
+                 dishonest_prob,                                # fraction of miners that are dishonest
+                 premine_blocks,                                # number of honest blocks mined during pre-mine period and during post-target period
+                 target_blocks,                                 # number of honest blocks mined during target period (window or payment period)
+                 max_resets):                                   # number of times dishonest chain is reset to honest chain during target period
+        self.q = dishonest_prob
+        self.p = 1.0 - dishonest_prob
+        self.premine_blocks = premine_blocks
+        self.target_blocks = target_blocks
+        self.max_resets = max_resets
+        self.phase_seconds = np.zeros(len(self.phases))         # seconds spent in each phase by last shard, or by all shards after run
+        self.lead_tails = None                                  # P(lead >= m) after pre-mine period and P(gain >= m) during post period, once tabulated
+
+    def dishonest_runs(self, rng, trials, cols, honest_prob=None):
+                                                                # numbers of dishonest blocks mined before each of "cols" honest blocks
+        return rng.geometric(self.p if honest_prob is None else honest_prob, size=(trials, cols)) - 1
+
+    def reflected_lead(self, rng, lead, resets, honest_blocks, honest_prob=None):
+                                                                # simulates "honest_blocks" honest blocks with up to "resets" resets per trial
+                                                                # returns lead, remaining resets and number of dishonest blocks mined
+        trials = lead.size
+        dishonest = np.zeros(trials, dtype=np.int64)
+        done = 0
+        while (done < honest_blocks):
+            cols = min(honest_blocks - done, max(1, BATCH_VALUES // trials))
+            runs = self.dishonest_runs(rng, trials, cols, honest_prob)
+            walk = lead[:, None] + np.cumsum(runs - 1, axis=1)  # lead after each honest block, ignoring resets
+            applied = np.minimum(np.maximum(-walk.min(axis=1), 0), resets)
+                                                                # each new minimum below zero is one reset, until resets run out
+            lead = walk[:, -1] + applied
+            resets = resets - applied
+            dishonest += runs.sum(axis=1)
+            done += cols
+        return lead, resets, dishonest
+
+    def catches_up(self, rng, lead, honest_blocks, honest_prob=None):
+                                                                # returns whether dishonest chain catches up within "honest_blocks" honest blocks,
+                                                                # and highest lead reached (only until it catches up)
+        success = (lead >= 0)
+        highest = lead.copy()
+        pending = np.flatnonzero(~success)                      # trials that have not yet caught up
+        lead = lead[pending]
+        done = 0
+        while ((done < honest_blocks) and (pending.size > 0)):
+            cols = min(honest_blocks - done, max(1, BATCH_VALUES // pending.size))
+            runs = self.dishonest_runs(rng, pending.size, cols, honest_prob)
+            peak = (lead[:, None] + np.cumsum(runs, axis=1) - np.arange(cols)).max(axis=1)
+                                                                # highest lead, reached just before one of the honest blocks
+            highest[pending] = np.maximum(highest[pending], peak)
+            caught = (peak >= 0)
+            success[pending[caught]] = True
+            lead = (lead + runs.sum(axis=1) - cols)[~caught]
+            pending = pending[~caught]
+            done += cols
+        return success, highest
+
+    def geometric_prefix(self, probs):                          # returns sum of probs[i] * q**(k - i) over i <= k, for each k
+        block = max(1, int(512.0 / -math.log(self.q))) if (self.q > 0.0) else 1
+                                                                # chunks are short enough that q**-block does not overflow
+        powers = self.q ** np.arange(min(block, probs.size))
+        prefix = np.empty_like(probs)
+        carry = 0.0                                             # prefix just before current chunk
+        for start in range(0, probs.size, block):
+            chunk = probs[start : start + block]
+            scale = powers[:chunk.size]
+            prefix[start : start + chunk.size] = np.cumsum(chunk / scale) * scale + carry * self.q * scale
+            carry = prefix[start + chunk.size - 1]
+        return prefix
+
+    def prepare(self):                                          # tabulates exact distributions of pre-mine lead and post-period gain, unless q >= p or done already
+        if ((self.lead_tails is not None) or (self.q >= self.p)):
+            return
+        ratio = self.q / self.p                                 # P(reflected lead >= m) <= ratio**m after any number of honest blocks
+        size = 2 if (ratio == 0.0) else int((TAIL_BITS * math.log(2) + math.log(self.premine_blocks + 1)) / -math.log(ratio)) + 2
+        lead = np.zeros(size)                                   # distribution of lead after each pre-mine honest block
+        lead[0] = 1.0
+        gain = lead.copy()                                      # distribution of lead just before last honest block, which is highest lead
+                                                                # added during post period (0 if it has no honest blocks)
+        for _ in range(self.premine_blocks):
+            gain = self.p * self.geometric_prefix(lead)         # lead plus dishonest blocks mined before next honest block
+            lead = np.append(gain[1:], 0.0)
+            lead[0] += gain[0]                                  # reset when honest block would take lead below 0
+        self.lead_tails = tuple(np.concatenate(([1.0], np.cumsum(probs[::-1])[::-1][1:])) for probs in (lead, gain))
+                                                                # summed from the tail, so small tail probabilities keep their precision
+
+    def draw(self, rng, tail, trials):                          # draws "trials" values with P(value >= m) = tail[m], from one uniform each
+        return np.searchsorted(-tail[1:], -rng.random(trials), side='left')
+
+    def premine_lead(self, rng, trials):                        # returns lead after pre-mine period (at most one reset per honest block)
+        if (self.lead_tails is not None):
+            return self.draw(rng, self.lead_tails[0], trials)
+        lead, _, _ = self.reflected_lead(rng, np.zeros(trials, dtype=np.int64), self.premine_blocks, self.premine_blocks)
+        return lead
+
+    def post_race(self, rng, lead):                             # returns whether dishonest chain catches up during post-target period,
+                                                                # and highest lead reached (only until it catches up)
+        if (self.lead_tails is None):
+            return self.catches_up(rng, lead, self.premine_blocks)
+        highest = lead + self.draw(rng, self.lead_tails[1], lead.size)
+        return (highest >= 0), highest
+
+    def end_phase(self, phase, start_time):                     # adds seconds since start_time to given phase; returns current time
+        now = time.perf_counter()
+        self.phase_seconds[phase] += now - start_time
+        return now
+
+    def run_batch(self, rng, trials):                           # returns sum and sum of squares of per-trial estimates (1 for each successful attack)
+        start_time = time.perf_counter()
+        lead = self.premine_lead(rng, trials)
+        start_time = self.end_phase(0, start_time)
+        lead, _, _ = self.reflected_lead(rng, lead, self.max_resets, self.target_blocks)
+                                                                # target period
+        start_time = self.end_phase(1, start_time)
+        success, _ = self.post_race(rng, lead)
+        self.end_phase(2, start_time)
+        successes = int(np.count_nonzero(success))
+        return successes, successes
+
+    def run_shard(self, seed, shard, trials):                   # returns sum and sum of squares of per-trial estimates in given shard of trials, and seconds spent in each phase
+        rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(shard,)))
+                                                                # each shard has its own stream derived from master seed
+        self.prepare()
+        self.phase_seconds = np.zeros(len(self.phases))
+        return self.run_batch(rng, trials) + (self.phase_seconds,)
+
+    def run(self, trials, seed, workers=1, progress=None):      # returns sum and sum of squares of per-trial estimates in "trials" trials
+                                                                # calls progress(trials done) after each shard, if given
+        start_time = time.perf_counter()
+        self.prepare()                                          # before shards are sent to workers, so they do not each repeat it
+        prepare_seconds = time.perf_counter() - start_time
+        shards = range((trials + BATCH_TRIALS - 1) // BATCH_TRIALS)
+        sizes = [min(BATCH_TRIALS, trials - shard * BATCH_TRIALS) for shard in shards]
+                                                                # shards do not depend on "workers", so results do not either
+        pool = ProcessPoolExecutor(max_workers=workers) if (workers > 1) else None
+        try:
+            results = []
+            done = 0
+            for size, result in zip(sizes, (pool.map if pool else map)(self.run_shard, [seed] * len(sizes), shards, sizes)):
+                results.append(result)
+                done += size
+                if (progress):
+                    progress(done)
+        finally:
+            if (pool):
+                pool.shutdown()
+        columns = [sum(column) for column in zip(*results)]     # summed in shard order
+        self.phase_seconds = columns.pop()                      # summed over shards, so over workers when "workers" > 1
+        self.phase_seconds[0] += prepare_seconds
+        return tuple(columns)
+
+    def interval(self, total, squares, trials, z):              # returns Wilson score interval for success probability
+        mean = total / trials
+        center = (mean + z * z / (2 * trials)) / (1 + z * z / trials)
+        half_width = z * math.sqrt(mean * (1 - mean) / trials + z * z / (4 * trials * trials)) / (1 + z * z / trials)
+        return max(center - half_width, 0.0), min(center + half_width, 1.0)
+
+    def run_adaptive(self, max_trials, seed, rel_err, confidence, time_budget=None, workers=1, progress=None):
+                                                                # runs shards until interval half-width is within "rel_err" of estimate, "max_trials" trials
+                                                                # have run or "time_budget" seconds have passed, calling progress(trials done) after each shard
+                                                                # returns sum and sum of squares of per-trial estimates, trials used, interval and seconds used
+        if (workers < 1):
+            raise ValueError(f'number of workers must be at least 1, not {workers}')
+        z = NormalDist().inv_cdf(0.5 + confidence / 2.0)
+        start_time = time.monotonic()
+        total = squares = trials = 0
+        low, high = 0.0, 1.0
+        phase_seconds = np.zeros(len(self.phases))
+        self.prepare()
+        phase_seconds[0] = time.monotonic() - start_time
+        pool = ProcessPoolExecutor(max_workers=workers) if (workers > 1) else None
+        try:
+            shard = 0
+            converged = False
+            while ((not converged) and (trials < max_trials)):
+                shards = range(shard, min(shard + workers, (max_trials + BATCH_TRIALS - 1) // BATCH_TRIALS))
+                sizes = [min(BATCH_TRIALS, max_trials - index * BATCH_TRIALS) for index in shards]
+                results = (pool.map if pool else map)(self.run_shard, [seed] * len(sizes), shards, sizes)
+                for size, (shard_total, shard_squares, shard_phase_seconds) in zip(sizes, results):
+                                                                # stopping is checked after every shard, in order, so it does not depend on "workers"
+                    total += shard_total
+                    squares += shard_squares
+                    phase_seconds += shard_phase_seconds
+                    trials += size
+                    shard += 1
+                    if (progress):
+                        progress(trials)
+                    low, high = self.interval(total, squares, trials, z)
+                    if ((total > 0) and (high - low <= 2.0 * rel_err * total / trials)):
+                        converged = True
+                        break
+                if ((time_budget is not None) and (time.monotonic() - start_time >= time_budget)):
+                    break
+        finally:
+            if (pool):
+                pool.shutdown(cancel_futures=True)
+        self.phase_seconds = phase_seconds
+        return total, squares, trials, low, high, time.monotonic() - start_time
+
+class TiltedBlockRace(BlockRace):                               # estimates small probabilities of successful attack by importance sampling
+    # The pre-mine period is drawn as is.  During the target period, dishonest blocks are mined with the probability that
+    # makes the expected number of dishonest blocks equal to the number the attacker still needs (target_blocks minus the
+    # pre-mine lead minus the resets available), and each trial is weighted by the likelihood ratio of its blocks under the
+    # true and tilted probabilities, times the exact probability of catching up from its deficit during the post-target
+    # period, so the estimate is unbiased.  If q >= p, catching up is likely anyway, so the post-target period is simulated
+    # with the true probabilities and only the target period contributes to the weight.
+
+    def target_tilt(self, lead):                                # returns per-trial dishonest probability used during target period
+        needed = np.maximum(self.target_blocks - self.max_resets - lead, 0)
+        return np.maximum(needed / (self.target_blocks + needed), self.q)
+
+    def run_batch(self, rng, trials):                           # returns sum and sum of squares of per-trial weighted estimates
+        start_time = time.perf_counter()
+        lead = self.premine_lead(rng, trials)                   # pre-mine period (not tilted)
+        start_time = self.end_phase(0, start_time)
+        tilt = self.target_tilt(lead)
+        lead, _, dishonest = self.reflected_lead(rng, lead, self.max_resets, self.target_blocks, (1.0 - tilt)[:, None])
+                                                                # target period
+        log_weight = dishonest * np.log(self.q / tilt) + self.target_blocks * np.log(self.p / (1.0 - tilt))
+        start_time = self.end_phase(1, start_time)
+        if (self.lead_tails is not None):
+            tail = np.append(self.lead_tails[1], 0.0)
+            weights = np.exp(log_weight) * tail[np.clip(-lead, 0, tail.size - 1)]
+                                                                # post-target period, as probability of catching up
+        else:
+            success, _ = self.catches_up(rng, lead, self.premine_blocks)
+                                                                # post-target period (not tilted)
+            weights = np.where(success, np.exp(log_weight), 0.0)
+        self.end_phase(2, start_time)
+        return float(weights.sum()), float((weights ** 2).sum())
+
+    def interval(self, total, squares, trials, z):              # returns normal-approximation interval for weighted estimate
+        mean = total / trials
+        half_width = z * math.sqrt(max(squares / trials - mean ** 2, 0.0) / trials)
+        return max(mean - half_width, 0.0), mean + half_width
+
+class DepthCurveRace(BlockRace):                                # simulates one block sequence per trial and scores it against every depth from 1 to max_depth
+    # For depth d, the pre-mine, payment and post-payment periods are honest blocks 1..F*d, F*d+1..(F+1)*d and
+    # (F+1)*d+1..(2F+1)*d of the same sequence, where F is premine_factor, so each depth is simulated exactly as
+    # monte_double_spend.py does, but all depths share (common) random numbers.  As periods differ between depths, time is
+    # split only between simulating the whole block sequence and scoring it against each depth.
+    phases = ('simulate', 'score')
+
+    def __init__(self,
+                 dishonest_prob,                                # fraction of miners that are dishonest
+                 premine_factor,                                # number of multiples of depth honest blocks mined during pre-mine and post-payment periods
+                 max_depth):                                    # maximum depth of payment
+        super().__init__(dishonest_prob, premine_factor * max_depth, max_depth, 0)
+        self.premine_factor = premine_factor
+        self.max_depth = max_depth
+
+    def prepare(self):                                          # periods are shared between depths, so nothing is tabulated
+        pass
+
+    def run_batch(self, rng, trials):                           # returns per-depth numbers of successful attacks (twice, as sum and sum of squares)
+        depths = np.arange(1, self.max_depth + 1)
+        premine_end = self.premine_factor * depths
+        payment_end = premine_end + depths
+        post_end = payment_end + premine_end
+        honest_blocks = post_end[-1]
+        successes = np.zeros(self.max_depth, dtype=np.int64)
+        rows = max(1, BATCH_VALUES // honest_blocks)
+        for start in range(0, trials, rows):
+            start_time = time.perf_counter()
+            count = min(rows, trials - start)
+            walk = np.zeros((count, honest_blocks + 1), dtype=np.int64)
+            np.cumsum(self.dishonest_runs(rng, count, honest_blocks) - 1, axis=1, out=walk[:, 1:])
+                                                                # walk[:, n] is lead after n honest blocks, ignoring resets
+            floor = np.minimum.accumulate(walk, axis=1)         # lead after n honest blocks of pre-mine is walk[:, n] - floor[:, n]
+            start_time = self.end_phase(0, start_time)
+            # Both ends of the post-payment period of depth d grow with d, and so does its length F*d, so maxima over it are
+            # found from a sparse table built in place one level at a time: once "span" is the largest power of 2 not above the
+            # length, walk[:, n] holds the maximum of the original walk[:, n : n + span], and the maximum over the period is
+            # that of two overlapping spans.  This takes O(H log H) rather than O(D * H) operations per trial.
+            span = 1
+            for i in range(self.max_depth):
+                low, high = payment_end[i] + 1, post_end[i] + 1
+                while (2 * span <= high - low):
+                    np.maximum(walk[:, :-span], walk[:, span:], out=walk[:, :-span])
+                    span *= 2
+                highest = np.maximum(walk[:, low], walk[:, high - span]) + 1
+                                                                # highest lead (plus floor) just before a post-payment honest block
+                successes[i] += np.count_nonzero(highest >= floor[:, premine_end[i]])
+            self.end_phase(1, start_time)
+        return successes, successes
+
+class WindowCurveRace(BlockRace):                               # simulates one block sequence per trial and scores it against every b from 1 to w
+    # With unlimited resets the window period would need "demand" resets.  With b - 1 resets, the lead at the end of the
+    # window is "base" + min(demand, b - 1), where "base" is the lead with no resets, so a trial succeeds for exactly those
+    # b that give enough resets to cover what the post-window race cannot make up.
+    def __init__(self,
+                 dishonest_prob,                                # fraction of miners that are dishonest
+                 premine_blocks,                                # number of honest blocks mined during pre-mine period and during post-window period
+                 w):                                            # number of honest blocks in window
+        super().__init__(dishonest_prob, premine_blocks, w, w - 1)
+
+    def run_batch(self, rng, trials):                           # returns per-b numbers of successful attacks (twice, as sum and sum of squares)
+        start_time = time.perf_counter()
+        lead = self.premine_lead(rng, trials)
+        start_time = self.end_phase(0, start_time)
+        lead, remaining, _ = self.reflected_lead(rng, lead, self.target_blocks, self.target_blocks)
+        start_time = self.end_phase(1, start_time)
+        demand = self.target_blocks - remaining                 # resets used when they are unlimited
+        base = lead - demand
+        _, highest = self.post_race(rng, base)
+        needed = -highest                                       # resets needed so that dishonest chain catches up
+        b_min = np.where(needed <= 0, 1, np.where(demand >= needed, needed + 1, self.target_blocks + 1))
+        successes = np.cumsum(np.bincount(b_min, minlength=self.target_blocks + 2)[1:self.target_blocks + 1])
+                                                                # element b - 1 counts trials that succeed with b
+        self.end_phase(2, start_time)
+        return successes, successes
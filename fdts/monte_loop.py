@@ -0,0 +1,121 @@
+# Block-by-block Monte Carlo simulations used by monte_window.py and monte_double_spend.py with "-e python"
+# Simulates one block at a time with the random module; slow, but serves as a check on fdts.monte_engine
+
+import time
+import random
+
+PHASES = ('premine', 'target', 'post')                          # phases whose seconds are added to phase_seconds
+PROGRESS_TRIALS = 1000                                          # number of trials between calls to progress
+
+def double_spend_trials(dishonest_prob,                         # fraction of hashpower that is dishonest
+                        premine_blocks,                         # number of honest blocks mined during pre-mine period and post-payment period
+                        depth,                                  # depth of payment in blockchain (in blocks)
+                        trials,                                 # number of Monte Carlo trials
+                        seed,                                   # seed of random number generator
+                        phase_seconds=None,                     # list to which seconds spent in each of PHASES are added, if given
+                        progress=None):                         # called as progress(trials done) every PROGRESS_TRIALS trials, if given
+                                                                # returns number of double-spend attack successes
+    random_generator = random.Random()
+    random_generator.seed(seed)
+    successes = 0.0                                             # number of double-spend attack successes
+    blocks = premine_blocks
+    seconds = [0.0] * len(PHASES)
+    for trial in range(trials):                                 # perform "trials" Monte Carlo trials
+        start_time = time.perf_counter()
+        honest_block = 0                                        # block number of last block mined by honest miners
+        dishonest_block = 0                                     # block number of last block mined by dishonest miners
+        while (honest_block < blocks):                          # simulate pre-mine period
+            if (random_generator.random() < dishonest_prob):
+                dishonest_block += 1
+            else:
+                honest_block += 1
+                if (dishonest_block < honest_block):
+                    dishonest_block = honest_block
+        premine_time = time.perf_counter()
+        while (honest_block < blocks + depth):                  # simulate payment period
+            if (random_generator.random() < dishonest_prob):
+                dishonest_block += 1
+            else:
+                honest_block += 1
+        target_time = time.perf_counter()
+        if (dishonest_block >= honest_block):
+            successful_attack = True
+        else:
+            successful_attack = False
+        while ((not successful_attack) and (honest_block < 2 * blocks + depth)): # simulate post-payment period
+            if (random_generator.random() < dishonest_prob):
+                dishonest_block += 1
+                if (dishonest_block >= honest_block):
+                    successful_attack = True
+            else:
+                honest_block += 1
+        if (successful_attack):
+            successes += 1
+        post_time = time.perf_counter()
+        seconds[0] += premine_time - start_time
+        seconds[1] += target_time - premine_time
+        seconds[2] += post_time - target_time
+        if ((progress) and ((trial + 1) % PROGRESS_TRIALS == 0)):
+            progress(trial + 1)
+    if (phase_seconds is not None):
+        phase_seconds[:] = [total + added for total, added in zip(phase_seconds, seconds)]
+    return successes
+
+def window_trials(dishonest_prob,                               # fraction of hashpower that is dishonest
+                  premine_blocks,                               # number of honest blocks mined during pre-mine period and post-window period
+                  w,                                            # number of blocks in window
+                  b,                                            # excess number of honest blocks in window
+                  trials,                                       # number of Monte Carlo trials
+                  seed,                                         # seed of random number generator
+                  phase_seconds=None,                           # list to which seconds spent in each of PHASES are added, if given
+                  progress=None):                               # called as progress(trials done) every PROGRESS_TRIALS trials, if given
+                                                                # returns number of trials that resulted in a window without excess honest blocks
+    random_generator = random.Random()
+    random_generator.seed(seed)
+    dishonest_windows = 0                                       # number of trials that resulted in a window without excess honest blocks
+    seconds = [0.0] * len(PHASES)
+    for trial in range(trials):                                 # perform "trials" Monte Carlo trials
+        start_time = time.perf_counter()
+        honest_block = 0                                        # block number of last block mined by honest miners
+        dishonest_block = 0                                     # block number of last block mined by dishonest miners
+        while (honest_block < premine_blocks):                  # simulate pre_mine period
+            if (random_generator.random() < dishonest_prob):
+                dishonest_block += 1
+            else:
+                honest_block += 1
+                if (dishonest_block < honest_block):
+                    dishonest_block = honest_block
+        premine_time = time.perf_counter()
+        honest_blocks_permanently_on_chain_in_window = 0        # number of honest blocks within given window that are permanently on-chain
+        while (honest_block < premine_blocks + w):              # simulate window period
+            if (random_generator.random() < dishonest_prob):
+                dishonest_block += 1
+            else:
+                honest_block += 1
+                if (dishonest_block < honest_block):
+                    if (honest_blocks_permanently_on_chain_in_window < b - 1):
+                        honest_blocks_permanently_on_chain_in_window += 1
+                        dishonest_block = honest_block
+        target_time = time.perf_counter()
+        if (dishonest_block >= honest_block):
+            dishonest_window = True
+        else:
+            dishonest_window = False
+        while ((not dishonest_window) and (honest_block < 2 * premine_blocks + w)): # simulate post-window period
+            if (random_generator.random() < dishonest_prob):
+                dishonest_block += 1
+                if (dishonest_block >= honest_block):
+                    dishonest_window = True
+            else:
+                honest_block += 1
+        if (dishonest_window):
+            dishonest_windows += 1
+        post_time = time.perf_counter()
+        seconds[0] += premine_time - start_time
+        seconds[1] += target_time - premine_time
+        seconds[2] += post_time - target_time
+        if ((progress) and ((trial + 1) % PROGRESS_TRIALS == 0)):
+            progress(trial + 1)
+    if (phase_seconds is not None):
+        phase_seconds[:] = [total + added for total, added in zip(phase_seconds, seconds)]
+    return dishonest_windows
@@ -0,0 +1,90 @@
+# Output shared by the programs: either their usual lines of text, or JSONL or CSV records streamed as soon as each is produced
+# Besides one "result" record per result, structured output has "progress" records (rate and ETA), "phase" records (seconds
+# spent in each phase of the calculation) and a final "summary" record, each carrying the peak resident set size so far
+# Non-finite values, such as the log of a probability that underflows to 0, are written as null in JSONL and left empty in CSV,
+# so the output is valid JSON
+
+import sys
+import csv
+import json
+import math
+import time
+from contextlib import contextmanager
+try:
+    import resource
+except ImportError:                                             # not available on Windows
+    resource = None
+
+FORMATS = ['text', 'jsonl', 'csv']
+STATUS_FIELDS = ['phase', 'seconds', 'done', 'total', 'rate', 'eta_seconds', 'peak_rss_kib']
+                                                                # fields of progress, phase and summary records
+
+def peak_rss_kib():                                             # returns peak resident set size in KiB of this process plus its largest finished child, or None if unknown
+    if (resource is None):
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak  # ru_maxrss is in bytes on macOS and KiB elsewhere
+
+def finite_or_none(value):                                      # returns value, or None if it is an infinite or NaN float
+    return None if (isinstance(value, float) and (not math.isfinite(value))) else value
+
+class Reporter(object):                                         # writes results, progress, phase timing and summary in the chosen format
+    def __init__(self,
+                 output_format,                                 # one of FORMATS
+                 fields,                                        # names of fields of result records
+                 progress_interval=1.0,                         # minimum number of seconds between progress records
+                 stream=sys.stdout):                            # stream records are written to
+        self.output_format = output_format
+        self.progress_interval = progress_interval
+        self.stream = stream
+        self.start_time = time.perf_counter()
+        self.last_progress = None                               # time of last progress record
+        self.phase_seconds = {}                                 # seconds spent so far in each phase, in order first seen
+        self.writer = None
+        if (output_format == 'csv'):
+            self.writer = csv.DictWriter(stream, ['record'] + fields + STATUS_FIELDS, restval='', lineterminator='\n')
+            self.writer.writeheader()
+
+    def emit(self, record, values):                             # writes one record of given kind immediately (nothing in text format)
+        if (self.output_format == 'text'):
+            return
+        row = dict(record=record, **{field: finite_or_none(value) for field, value in values.items()})
+        if (self.writer):
+            self.writer.writerow(row)
+        else:
+            self.stream.write(json.dumps(row, allow_nan=False) + '\n')
+        self.stream.flush()
+
+    def text(self, line):                                       # writes line, such as a table header, in text format only
+        if (self.output_format == 'text'):
+            print(line, file=self.stream)
+
+    def result(self, text, **values):                           # writes one result, as given line of text or as record of given values
+        self.text(text)
+        self.emit('result', values)
+
+    def progress(self, done, total):                            # writes progress record if at least progress_interval seconds have passed since last one
+        now = time.perf_counter()
+        if ((self.last_progress is not None) and (now - self.last_progress < self.progress_interval) and (done < total)):
+            return
+        self.last_progress = now
+        elapsed = now - self.start_time
+        rate = done / elapsed if (elapsed > 0.0) else 0.0
+        eta_seconds = (total - done) / rate if (rate > 0.0) else None
+        self.emit('progress', dict(done=done, total=total, rate=rate, eta_seconds=eta_seconds, peak_rss_kib=peak_rss_kib()))
+
+    def add_phase(self, phase, seconds):                        # adds seconds to time spent in given phase
+        self.phase_seconds[phase] = self.phase_seconds.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def timing(self, phase):                                    # adds time spent within "with" block to given phase
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(phase, time.perf_counter() - start_time)
+
+    def finish(self):                                           # writes one phase record per phase, then summary record
+        for phase, seconds in self.phase_seconds.items():
+            self.emit('phase', dict(phase=phase, seconds=seconds))
+        self.emit('summary', dict(seconds=time.perf_counter() - self.start_time, peak_rss_kib=peak_rss_kib()))
@@ -0,0 +1,55 @@
+# Finds the minimum payment depth with double spend risk at most "eps", or the largest "b" for a window of "w" blocks with FDT attack risk at most "eps"
+
+from decimal import Decimal, InvalidOperation
+from fdts.double_spend import DoubleSpend
+
+def parse_log_eps(text):                                        # returns natural log of risk written as decimal number, such as "1e-400", which may be far below smallest float
+                                                                # raises ValueError unless text is a positive finite number
+    try:
+        eps = Decimal(text)
+    except InvalidOperation:
+        raise ValueError(f'risk {text!r} is not a number')
+    if ((not eps.is_finite()) or (eps <= 0)):
+        raise ValueError(f'risk {text!r} must be positive')
+    return float(eps.ln())
+
+def format_eps(eps):                                            # returns Decimal risk formatted like a float with "9.2e", even below smallest float
+    mantissa, exponent = f'{eps:.2e}'.split('e')
+    return f'{mantissa}e{int(exponent):+03d}'.rjust(9)
+
+def min_safe_depth(dishonest_frac,                              # fraction of miners that are dishonest
+                   log_eps,                                     # natural log of largest acceptable double spend risk
+                   max_depth):                                  # largest depth considered
+                                                                # returns minimum depth with risk at most exp(log_eps), or None if no depth up to max_depth is safe
+    hi = 1
+    while True:                                                 # double depth until risk is at most eps
+        double_spend = DoubleSpend(hi, dishonest_frac)
+        if (double_spend.calc_log_double_spend(hi)[1] <= log_eps):
+            break
+        if (hi >= max_depth):
+            return None
+        hi = min(2 * hi, max_depth)
+    lo = hi // 2                                                # risk at lo is above eps (or lo is 0)
+    while (hi - lo > 1):                                        # risk decreases with depth, so bisect between lo and hi
+        mid = (lo + hi) // 2
+        if (double_spend.calc_log_double_spend(mid)[1] <= log_eps):
+            hi = mid
+        else:
+            lo = mid
+    return hi
+
+def max_safe_b(dishonest_prob,                                  # fraction of miners that are dishonest
+               log_eps,                                         # natural log of largest acceptable FDT attack risk
+               window):                                         # Window for given fraction of dishonest miners
+                                                                # returns largest b with risk at most exp(log_eps), or 0 if even b = 1 is not safe
+    if (window.calc_log_few_honest_prob(1)[1] > log_eps):
+        return 0
+    lo = 1                                                      # risk at lo is at most eps
+    hi = window.w + 1
+    while (hi - lo > 1):                                        # risk increases with b, so bisect between lo and hi
+        mid = (lo + hi) // 2
+        if (window.calc_log_few_honest_prob(mid)[1] <= log_eps):
+            lo = mid
+        else:
+            hi = mid
+    return lo
@@ -0,0 +1,96 @@
+# Calculates double spend risk (as in fdts.double_spend) or window risk (as in fdts.window) for a whole grid of values of the fraction of dishonest miners at once
+
+import math
+import numpy as np
+
+class LogFactorials(object):                                    # natural logs of factorials, shared by all fractions of dishonest miners
+    def __init__(self,
+                 max_n):                                        # largest n for which log(n!) is needed
+      self.max_n = max_n
+      self.value = np.array([math.lgamma(n + 1) for n in range(max_n + 1)])
+                                                                # self.value[n] gives log(n!)
+
+    def log_binomial(self, successes, trials, log_prob, log_fail):
+                                                                # return log of binomial probabilities; successes and trials are arrays indexed by position, log_prob and log_fail by fraction
+        return ((self.value[trials] - self.value[successes] - self.value[trials - successes])[None, :]
+                + np.outer(log_prob, successes) + np.outer(log_fail, trials - successes))
+
+class DoubleSpendSweep(object):                                 # calculates probability of a double spend for every depth up to max_depth and every given fraction of dishonest miners
+    def __init__(self,
+                 max_depth,                                     # maximum depth of spend attempting to be double spent
+                 dishonest_fracs,                               # array of fractions of miners that are dishonest
+                 log_factorials):                               # log factorials up to at least 2*max_depth
+        self.max_depth = max_depth
+        self.dishonest_frac = np.asarray(dishonest_fracs, dtype=float)
+        self.honest_frac = 1.0 - self.dishonest_frac
+        self.ratio = self.dishonest_frac / self.honest_frac
+        self.log_factorials = log_factorials
+
+    def calc_all_double_spends(self):                           # returns array whose element [i, depth - 1] is probability for i-th fraction and "depth"
+                                                                # same single-pass recurrences as DoubleSpend.calc_all_double_spends in fdts.double_spend
+        q = self.dishonest_frac[:, None]
+        p = self.honest_frac[:, None]
+        log_p = np.log(self.honest_frac)
+        log_q = np.log(self.dishonest_frac)
+        k = np.arange(self.max_depth)
+        node_probs = np.exp(self.log_factorials.log_binomial(k, self.max_depth - 1 + k, log_p, log_q)) * q
+        node_sum = node_probs.sum(axis=1)                       # sum of node_prob for max_depth
+        deficit_sum = (node_probs * (self.max_depth - k)).sum(axis=1)
+                                                                # sum of deficit * node_prob for max_depth
+        depths = np.arange(1, self.max_depth + 1)
+        central = np.exp(self.log_factorials.log_binomial(depths - 1, 2 * depths - 1, log_p, log_q)) * p
+        central[:, -1] = 0.0                                    # max_depth needs no correction
+        node_sums = node_sum[:, None] + np.cumsum(((p - q) * central)[:, ::-1], axis=1)[:, ::-1]
+        deficit_sums = depths * (deficit_sum[:, None] / self.max_depth
+                                 + np.cumsum((2.0 * p * central / (depths + 1))[:, ::-1], axis=1)[:, ::-1])
+        ratio = self.ratio[:, None]
+        return 2.0 * node_sums + (ratio - ratio ** 2) * deficit_sums
+
+class WindowSweep(object):                                      # calculates probability of fewer than "b" honest blocks for every b from 1 to w and every given fraction of dishonest miners
+    def __init__(self,
+                 w_log,                                         # base-4 logarithm of "w", which is size of window
+                 dishonest_probs,                               # array of fractions of miners that are dishonest
+                 log_factorials):                               # log factorials up to at least 2*w
+        self.w_log = w_log
+        self.w = 4 ** w_log
+        self.q = np.asarray(dishonest_probs, dtype=float)
+        self.p = 1.0 - self.q
+        self.log_factorials = log_factorials
+
+    def calc_all_few_honest_probs(self):                        # returns array whose element [i, b - 1] is probability for i-th fraction and "b"
+                                                                # same single-pass recurrences as Window.calc_all_few_honest_probs in fdts.window
+        log_p = np.log(self.p)
+        log_q = np.log(self.q)
+        r = self.q / self.p
+        t = r - r ** 2
+        n = np.arange(self.w)                                   # n = w - b
+        k = np.arange(self.w)
+        case2_last = (np.exp(self.log_factorials.log_binomial(k, self.w - 1 + k, log_p, log_q)).sum(axis=1) * self.q)
+        case2_steps = self.p[:, None] * np.exp(self.log_factorials.log_binomial(np.full(self.w, self.w - 1), n + self.w, log_p, log_q))
+        case2_steps[:, -1] = 0.0
+        case2_probs = case2_last[:, None] + np.cumsum(case2_steps[:, ::-1], axis=1)[:, ::-1]
+                                                                # element [i, n] is case 2 probability for b = w - n
+        binomial_probs = np.exp(self.log_factorials.log_binomial(np.full(self.w, self.w - 1), self.w - 1 + k, log_p, log_q))
+        probs = np.empty((self.q.size, self.w))
+        power_sum = np.zeros(self.q.size)
+        weighted_sum = np.zeros(self.q.size)
+        for i in range(self.w):
+            weighted_sum = r * (weighted_sum + power_sum)
+            power_sum = r * power_sum + binomial_probs[:, i]
+            probs[:, self.w - i - 1] = self.q * ((1.0 + t) * power_sum + t * weighted_sum) + case2_probs[:, i]
+        return probs
+
+def parse_range(text, kind):                                    # parses "start:stop[:step]" (inclusive) or comma-separated values
+                                                                # raises ValueError if text is malformed or range is empty
+    if (':' in text):
+        parts = [kind(part) for part in text.split(':')]
+        start, stop = parts[0], parts[1]
+        step = parts[2] if len(parts) > 2 else kind(1)
+        if (step == 0):
+            raise ValueError(f'step of range {text!r} must not be zero')
+        count = math.floor((stop - start) / step + 1e-9) + 1
+                                                                # never past stop; the tolerance keeps a stop reached up to rounding
+        if (count < 1):
+            raise ValueError(f'range {text!r} is empty')
+        return [round(start + i * step, 10) if kind is float else start + i * step for i in range(count)]
+    return [kind(part) for part in text.split(',')]
@@ -0,0 +1,81 @@
+# Calculates probability of a window of "w" consecutive blocks having fewer than "b" honest blocks, based on the fraction of dishonest miners and values of "w" and "b"
+
+import math
+from fdts.binomial import Binomial, log_sum_exp, sum_series
+
+class Window(object):                                           # calculates probability of a window of a given size having fewer than "b" honest blocks given fraction of dishonest miners
+    def __init__(self,
+                 w_log,                                         # base-4 logarithm of "w", which is size of window
+                 dishonest_prob):                               # fraction of miners that are dishonest
+        self.w_log = w_log
+        self.w = 4 ** w_log
+        self.q = dishonest_prob
+        self.p = 1.0 - dishonest_prob
+        self.binomial = Binomial(self.p, 2*self.w)              # calculates binomial distribution probabilities for <= 2*w trials
+
+    def calc_few_honest_prob(self,                              # calculates probability of given window having fewer than "b" honest blocks
+                             b):                                # excess number of honest blocks within window (1 <= b <= w)
+        if (self.q == 0.0):
+            return 0.0
+        r = self.q / self.p
+        # case 1: "w" honest blocks mined before "w - b + 1" dishonest blocks mined (ignoring pre-mine)
+        # term k, for k dishonest blocks mined when w honest blocks are first mined, is (w+k-1 choose w-1) * p^(w-1) * q^k * q * r^(w-k-b),
+        # so term(k + 1) / term(k) = p * (w+k) / (k+1), and the largest term is at k = p * (w-1) / q
+        top = min(int(self.p * (self.w - 1) / self.q), self.w - b)
+        log_top = self.binomial.get_log_value(self.w - 1, self.w + top - 1) + math.log(self.q) + (self.w - top - b) * math.log(r)
+        success_prob = sum_series(log_top, top, 0, self.w - b,
+                                  lambda k: self.p * (self.w + k) / (k + 1),
+                                  lambda k: 1.0 + (self.w - b - k + 1) * (r - r * r))
+        # case 2: "w - b + 1" dishonest blocks mined before "w" honest blocks mined (ignoring pre-mine)
+        # term k, for k honest blocks mined when "w - b + 1" dishonest blocks are first mined, is (w-b+k choose k) * p^k * q^(w-b) * q,
+        # so term(k + 1) / term(k) = p * (w-b+k+1) / (k+1), and the largest term is at k = p * (w-b) / q
+        top = min(int(self.p * (self.w - b) / self.q), self.w - 1)
+        log_top = self.binomial.get_log_value(top, self.w - b + top) + math.log(self.q)
+        success_prob += sum_series(log_top, top, 0, self.w - 1,
+                                   lambda k: self.p * (self.w - b + k + 1) / (k + 1),
+                                   lambda k: 1.0)
+        return success_prob
+
+    def calc_log_few_honest_prob(self,                          # log-domain version of calc_few_honest_prob, which does not underflow
+                                 b):                            # excess number of honest blocks within window (1 <= b <= w)
+                                                                # returns probability and its natural log; only valid for q < p, as for q >= p the
+                                                                # formula is outside the model's range and its sum may be negative, which gives (0.0, -inf)
+        import numpy as np
+        if (self.q == 0.0):
+            return 0.0, -math.inf
+        log_q = math.log(self.q)
+        log_ratio = math.log(self.q / self.p)
+        # case 1: "w" honest blocks mined before "w - b + 1" dishonest blocks mined (ignoring pre-mine)
+        k = np.arange(self.w - b + 1)
+        factor = 1.0 + (self.w - b - k + 1) * (self.q / self.p - (self.q / self.p) ** 2)
+                                                                # can be negative when q > p
+        with np.errstate(divide='ignore'):
+            case1_terms = (self.binomial.get_log_values(np.full(k.size, self.w - 1), self.w + k - 1) + log_q
+                           + (self.w - k - b) * log_ratio + np.log(np.abs(factor)))
+        # case 2: "w - b + 1" dishonest blocks mined before "w" honest blocks mined (ignoring pre-mine)
+        k = np.arange(self.w)
+        case2_terms = self.binomial.get_log_values(k, self.w - b + k) + log_q
+        log_prob = log_sum_exp(np.concatenate((case1_terms, case2_terms)), np.concatenate((np.sign(factor), np.ones(k.size))))
+        return math.exp(log_prob), log_prob
+
+    def calc_all_few_honest_probs(self):                        # calculates probability of fewer than "b" honest blocks for every b from 1 to w in a single pass
+                                                                # returns list whose element "b - 1" is probability for "b"
+        # With n = w - b, case 1 is q * ((1 + t) * power_sum(n) + t * weighted_sum(n)), where t = r - r^2, r = q/p,
+        # power_sum(n) = sum of binomial_prob(k) * r^(n-k) and weighted_sum(n) = sum of (n-k) * binomial_prob(k) * r^(n-k).
+        # Both follow from their values for n-1, in increasing n.  Case 2 is found directly for n = w - 1 (b = 1) and then
+        # for each smaller n by adding p * (n+w choose w-1) * p^(w-1) * q^(n+1), so no precision is lost to cancellation.
+        r = self.q / self.p
+        t = r - r ** 2
+        case2_probs = [0.0] * self.w                            # element n is case 2 probability for b = w - n
+        for k in range(self.w):
+            case2_probs[self.w - 1] += self.binomial.get_value(k, self.w - 1 + k) * self.q
+        for n in range(self.w - 2, -1, -1):
+            case2_probs[n] = case2_probs[n + 1] + self.p * self.binomial.get_value(self.w - 1, n + self.w)
+        probs = [0.0] * self.w
+        power_sum = 0.0
+        weighted_sum = 0.0
+        for n in range(self.w):
+            weighted_sum = r * (weighted_sum + power_sum)
+            power_sum = r * power_sum + self.binomial.get_value(self.w - 1, self.w + n - 1)
+            probs[self.w - n - 1] = self.q * ((1.0 + t) * power_sum + t * weighted_sum) + case2_probs[n]
+        return probs
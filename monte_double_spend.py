@@ -1,55 +1,94 @@
 # Monte Carlo simulation which calculates risk of a bitcoin payment being double spent based on its depth in the blockchain and the fraction of dishonest miner hashpower, with premining, assuming payment time is controlled by honest party
 # Usage: python3 monte_double_spend.py -f 0.35 -d 62 -t 1000000
+#        python3 monte_double_spend.py -f 0.35 -d 62 -t 100000000 -j 8 --format jsonl
 
 import sys
-import math
-import numpy as np
-import random
 import argparse
+from fdts.monte_engine import PREMINE_FACTOR, BlockRace, TiltedBlockRace, DepthCurveRace, relative_error
+from fdts.monte_loop import PHASES, double_spend_trials
+from fdts.report import FORMATS, Reporter
 
-PREMINE_FACTOR = 30                                             # number of multiples of "depth" honest blocks mined during pre-mine period and post-payment period
+PHASE_NAMES = {'target': 'payment', 'post': 'post_payment'}    # names of simulation phases in output
 
 # Main program
-parser = argparse.ArgumentParser(description='Calculate probability of a successful bitcoin payment double spend attack based on fraction of dishonest miner hashpower and depth of payment, given timing of attack selected by honest party')
-parser.add_argument('-f', dest='frac', help='fraction of hashpower that is dishonest')
-parser.add_argument('-d', dest='depth', help='depth of payment in blockchain (in blocks)')
-parser.add_argument('-t', dest='trials', help='number of Monte Carlo trials')
-args = parser.parse_args()
-dishonest_prob = float(args.frac)
-depth = int(args.depth)
-trials = int(args.trials)
-honest_prob = 1.0 - dishonest_prob
-random_generator = random.Random()
-random_generator.seed(1000+trials)
-successes = 0.0                                                 # number of double-spend attack successes
-blocks = PREMINE_FACTOR * depth
-for trial in range(trials):                                     # perform "trials" Monte Carlo trials
-    honest_block = 0                                            # block number of last block mined by honest miners
-    dishonest_block = 0                                         # block number of last block mined by dishonest miners
-    while (honest_block < blocks):                              # simulate pre-mine period
-        if (random_generator.random() < dishonest_prob):
-            dishonest_block += 1
-        else:
-            honest_block += 1
-            if (dishonest_block < honest_block):
-                dishonest_block = honest_block
-    while (honest_block < blocks + depth):                      # simulate payment period
-        if (random_generator.random() < dishonest_prob):
-            dishonest_block += 1
-        else:
-            honest_block += 1
-    if (dishonest_block >= honest_block):
-        successful_attack = True
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Calculate probability of a successful bitcoin payment double spend attack based on fraction of dishonest miner hashpower and depth of payment, given timing of attack selected by honest party')
+    parser.add_argument('-f', dest='frac', help='fraction of hashpower that is dishonest')
+    parser.add_argument('-d', dest='depth', help='depth of payment in blockchain (in blocks)')
+    parser.add_argument('-t', dest='trials', help='number of Monte Carlo trials (maximum number with --rel-err)')
+    parser.add_argument('-e', dest='engine', default='numpy', choices=['numpy', 'python'], help='simulation engine (default: numpy)')
+    parser.add_argument('-s', dest='seed', help='random seed (default: 1000 + number of trials)')
+    parser.add_argument('-j', '--workers', dest='workers', default='1', help='number of worker processes for numpy engine (default: 1)')
+    parser.add_argument('-i', dest='importance', action='store_true', help='estimate small probabilities by importance sampling (numpy engine only)')
+    parser.add_argument('--rel-err', dest='rel_err', help='stop once confidence interval half-width is within this fraction of estimate (numpy engine only)')
+    parser.add_argument('--confidence', dest='confidence', default='0.95', help='confidence level of interval used with --rel-err (default: 0.95)')
+    parser.add_argument('-c', dest='curve', action='store_true', help='estimate success probability for every depth from 1 to given depth from the same simulated blocks (numpy engine only)')
+    parser.add_argument('--time-budget', dest='time_budget', help='stop after this many seconds when using --rel-err')
+    parser.add_argument('--format', dest='output_format', default='text', choices=FORMATS, help='output format; jsonl and csv stream one record per result, plus progress, phase timing and peak memory records (default: text)')
+    parser.add_argument('--progress-interval', dest='progress_interval', default='1.0', help='minimum seconds between progress records (default: 1.0)')
+    args = parser.parse_args()
+    dishonest_prob = float(args.frac)
+    depth = int(args.depth)
+    trials = int(args.trials)
+    seed = int(args.seed) if args.seed is not None else 1000+trials
+    workers = int(args.workers)
+    confidence = float(args.confidence)
+    if (workers < 1):
+        parser.error('-j must be at least 1')
+    if (not (0.0 < confidence < 1.0)):
+        parser.error('--confidence must be between 0 and 1')
+    if ((args.time_budget is not None) and (args.rel_err is None)):
+        parser.error('--time-budget requires --rel-err')
+    if ((workers != 1) and (args.engine != 'numpy')):
+        parser.error('multiple workers require the numpy engine')
+    if ((args.importance) and (args.engine != 'numpy')):
+        parser.error('importance sampling requires the numpy engine')
+    if ((args.rel_err is not None) and (args.engine != 'numpy')):
+        parser.error('--rel-err requires the numpy engine')
+    if ((args.curve) and ((args.engine != 'numpy') or (args.importance) or (args.rel_err is not None))):
+        parser.error('-c requires the numpy engine and cannot be combined with -i or --rel-err')
+    fields = ['frac', 'depth', 'trials', 'success_prob']
+    if (args.rel_err is not None):
+        fields += ['low', 'high', 'confidence', 'trials_per_sec']
+    elif (args.importance):
+        fields += ['rel_err']
+    reporter = Reporter(args.output_format, fields, float(args.progress_interval))
+    max_trials = trials
+    progress = lambda done: reporter.progress(done, max_trials)
+    if (args.curve):
+        race = DepthCurveRace(dishonest_prob, PREMINE_FACTOR, depth)
+        successes, _ = race.run(trials, seed, workers, progress)
+    elif (args.rel_err is not None):
+        race_class = TiltedBlockRace if (args.importance) else BlockRace
+        race = race_class(dishonest_prob, PREMINE_FACTOR * depth, depth, 0)
+        time_budget = float(args.time_budget) if args.time_budget is not None else None
+        successes, squares, trials, low, high, seconds = race.run_adaptive(trials, seed, float(args.rel_err), confidence, time_budget, workers, progress)
+    elif (args.importance):
+        race = TiltedBlockRace(dishonest_prob, PREMINE_FACTOR * depth, depth, 0)
+        successes, squares = race.run(trials, seed, workers, progress)
+    elif (args.engine == 'numpy'):
+        race = BlockRace(dishonest_prob, PREMINE_FACTOR * depth, depth, 0)
+        successes, _ = race.run(trials, seed, workers, progress)
     else:
-        successful_attack = False
-    while ((not successful_attack) and (honest_block < 2 * blocks + depth)):         # simulate post-payment period
-        if (random_generator.random() < dishonest_prob):
-            dishonest_block += 1
-            if (dishonest_block >= honest_block):
-                successful_attack = True
-        else:
-            honest_block += 1
-    if (successful_attack):
-        successes += 1
-success_prob = successes / trials
-print('frac:', dishonest_prob, 'depth:', depth, 'trials:', trials, 'success_prob:', success_prob)
+        phases, phase_seconds = PHASES, [0.0] * len(PHASES)
+        successes = double_spend_trials(dishonest_prob, PREMINE_FACTOR * depth, depth, trials, seed, phase_seconds, progress)
+    if (args.engine == 'numpy'):
+        phases, phase_seconds = race.phases, race.phase_seconds
+    for phase, phase_time in zip(phases, phase_seconds):        # summed over workers when there are several
+        reporter.add_phase(PHASE_NAMES.get(phase, phase), float(phase_time))
+    success_prob = successes / trials
+    if (args.curve):
+        for payment_depth, count in enumerate(successes, start=1):
+            reporter.result(f'frac: {dishonest_prob} depth: {payment_depth} trials: {trials} success_prob: {count / trials}',
+                            frac=dishonest_prob, depth=payment_depth, trials=trials, success_prob=float(count / trials))
+    elif (args.rel_err is not None):
+        reporter.result(f'frac: {dishonest_prob} depth: {depth} trials: {trials} success_prob: {success_prob} interval: {low} {high} confidence: {confidence} trials_per_sec: {trials / seconds}',
+                        frac=dishonest_prob, depth=depth, trials=trials, success_prob=success_prob, low=low, high=high, confidence=confidence, trials_per_sec=trials / seconds)
+    elif (args.importance):
+        rel_err = relative_error(successes, squares, trials)
+        reporter.result(f'frac: {dishonest_prob} depth: {depth} trials: {trials} success_prob: {success_prob} rel_err: {rel_err}',
+                        frac=dishonest_prob, depth=depth, trials=trials, success_prob=success_prob, rel_err=rel_err)
+    else:
+        reporter.result(f'frac: {dishonest_prob} depth: {depth} trials: {trials} success_prob: {success_prob}',
+                        frac=dishonest_prob, depth=depth, trials=trials, success_prob=success_prob)
+    reporter.finish()
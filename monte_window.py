@@ -1,63 +1,101 @@
 # Monte Carlo simulation which calculates probability of a target window of "w" consecutive blocks having fewer than "b" honest blocks, based on the fraction of dishonest miners and values of "w" and "b"
 # Usage: python3 monte_window.py -f 0.25 -w 2 -b 1 -t 1000000
+#        python3 monte_window.py -f 0.25 -w 2 -b 1 -t 100000000 -j 8 --format csv
 
 import sys
-import math
-import numpy as np
-import random
 import argparse
+from fdts.monte_engine import PREMINE_FACTOR, BlockRace, TiltedBlockRace, WindowCurveRace, relative_error
+from fdts.monte_loop import PHASES, window_trials
+from fdts.report import FORMATS, Reporter
 
-PREMINE_FACTOR = 30                                             # number of multiples of "w" honest blocks mined during pre-mine period and post-window period
+PHASE_NAMES = {'target': 'window', 'post': 'post_window'}      # names of simulation phases in output
 
 # Main program
-parser = argparse.ArgumentParser(description='Calculate probability of a target window of w consecutive blocks having fewer than b honest blocks based on fraction of dishonest miners and values of w and b')
-parser.add_argument('-f', dest='frac', help='fraction of hashpower that is dishonest')
-parser.add_argument('-w', dest='window_log', help='base-4 logarithm of number of blocks in window')
-parser.add_argument('-b', dest='b_log', help='base-4 logarithm of b, which is excess number of honest blocks in window')
-parser.add_argument('-t', dest='trials', help='number of Monte Carlo trials')
-args = parser.parse_args()
-dishonest_prob = float(args.frac)
-honest_prob = 1.0 - dishonest_prob
-w_log = int(args.window_log)
-w = 4 ** w_log
-b_log = int(args.b_log)
-b = 4 ** b_log
-trials = int(args.trials)
-random_generator = random.Random()
-random_generator.seed(1000+trials)
-premine_blocks = PREMINE_FACTOR * w
-dishonest_windows = 0                                           # number of trials that resulted in a window without excess honest blocks
-for trial in range(trials):                                     # perform "trials" Monte Carlo trials
-    honest_block = 0                                            # block number of last block mined by honest miners
-    dishonest_block = 0                                         # block number of last block mined by dishonest miners
-    while (honest_block < premine_blocks):                      # simulate pre_mine period
-        if (random_generator.random() < dishonest_prob):
-            dishonest_block += 1
-        else:
-            honest_block += 1
-            if (dishonest_block < honest_block):
-                dishonest_block = honest_block
-    honest_blocks_permanently_on_chain_in_window = 0            # number of honest blocks within given window that are permanently on-chain
-    while (honest_block < premine_blocks + w):                  # simulate window period
-        if (random_generator.random() < dishonest_prob):
-            dishonest_block += 1
-        else:
-            honest_block += 1
-            if (dishonest_block < honest_block):
-                if (honest_blocks_permanently_on_chain_in_window < b - 1):
-                    honest_blocks_permanently_on_chain_in_window += 1
-                    dishonest_block = honest_block
-    if (dishonest_block >= honest_block):
-        dishonest_window = True
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Calculate probability of a target window of w consecutive blocks having fewer than b honest blocks based on fraction of dishonest miners and values of w and b')
+    parser.add_argument('-f', dest='frac', help='fraction of hashpower that is dishonest')
+    parser.add_argument('-w', dest='window_log', help='base-4 logarithm of number of blocks in window')
+    parser.add_argument('-b', dest='b_log', help='base-4 logarithm of b, which is excess number of honest blocks in window')
+    parser.add_argument('-t', dest='trials', help='number of Monte Carlo trials (maximum number with --rel-err)')
+    parser.add_argument('-e', dest='engine', default='numpy', choices=['numpy', 'python'], help='simulation engine (default: numpy)')
+    parser.add_argument('-s', dest='seed', help='random seed (default: 1000 + number of trials)')
+    parser.add_argument('-j', '--workers', dest='workers', default='1', help='number of worker processes for numpy engine (default: 1)')
+    parser.add_argument('-i', dest='importance', action='store_true', help='estimate small probabilities by importance sampling (numpy engine only)')
+    parser.add_argument('--rel-err', dest='rel_err', help='stop once confidence interval half-width is within this fraction of estimate (numpy engine only)')
+    parser.add_argument('--confidence', dest='confidence', default='0.95', help='confidence level of interval used with --rel-err (default: 0.95)')
+    parser.add_argument('-c', dest='curve', action='store_true', help='estimate success probability for every b from 1 to w from the same simulated blocks (ignores -b; numpy engine only)')
+    parser.add_argument('--time-budget', dest='time_budget', help='stop after this many seconds when using --rel-err')
+    parser.add_argument('--format', dest='output_format', default='text', choices=FORMATS, help='output format; jsonl and csv stream one record per result, plus progress, phase timing and peak memory records (default: text)')
+    parser.add_argument('--progress-interval', dest='progress_interval', default='1.0', help='minimum seconds between progress records (default: 1.0)')
+    args = parser.parse_args()
+    dishonest_prob = float(args.frac)
+    w_log = int(args.window_log)
+    w = 4 ** w_log
+    if ((args.b_log is None) and (not args.curve)):
+        parser.error('-b is required unless -c is given')
+    b_log = int(args.b_log) if (args.b_log is not None) else w_log
+    b = 4 ** b_log
+    trials = int(args.trials)
+    seed = int(args.seed) if args.seed is not None else 1000+trials
+    workers = int(args.workers)
+    confidence = float(args.confidence)
+    if (workers < 1):
+        parser.error('-j must be at least 1')
+    if (not (0.0 < confidence < 1.0)):
+        parser.error('--confidence must be between 0 and 1')
+    if ((args.time_budget is not None) and (args.rel_err is None)):
+        parser.error('--time-budget requires --rel-err')
+    if ((workers != 1) and (args.engine != 'numpy')):
+        parser.error('multiple workers require the numpy engine')
+    if ((args.importance) and (args.engine != 'numpy')):
+        parser.error('importance sampling requires the numpy engine')
+    if ((args.rel_err is not None) and (args.engine != 'numpy')):
+        parser.error('--rel-err requires the numpy engine')
+    if ((args.curve) and ((args.engine != 'numpy') or (args.importance) or (args.rel_err is not None))):
+        parser.error('-c requires the numpy engine and cannot be combined with -i or --rel-err')
+    fields = ['frac', 'w_log', 'b', 'trials', 'success_prob']
+    if (args.rel_err is not None):
+        fields += ['low', 'high', 'confidence', 'trials_per_sec']
+    elif (args.importance):
+        fields += ['rel_err']
+    reporter = Reporter(args.output_format, fields, float(args.progress_interval))
+    max_trials = trials
+    progress = lambda done: reporter.progress(done, max_trials)
+    if (args.curve):
+        race = WindowCurveRace(dishonest_prob, PREMINE_FACTOR * w, w)
+        dishonest_windows, _ = race.run(trials, seed, workers, progress)
+    elif (args.rel_err is not None):
+        race_class = TiltedBlockRace if (args.importance) else BlockRace
+        race = race_class(dishonest_prob, PREMINE_FACTOR * w, w, b - 1)
+        time_budget = float(args.time_budget) if args.time_budget is not None else None
+        dishonest_windows, squares, trials, low, high, seconds = race.run_adaptive(trials, seed, float(args.rel_err), confidence, time_budget, workers, progress)
+    elif (args.importance):
+        race = TiltedBlockRace(dishonest_prob, PREMINE_FACTOR * w, w, b - 1)
+        dishonest_windows, squares = race.run(trials, seed, workers, progress)
+    elif (args.engine == 'numpy'):
+        race = BlockRace(dishonest_prob, PREMINE_FACTOR * w, w, b - 1)
+        dishonest_windows, _ = race.run(trials, seed, workers, progress)
     else:
-        dishonest_window = False
-    while ((not dishonest_window) and (honest_block < 2 * premine_blocks + w)):         # simulate post-window period
-        if (random_generator.random() < dishonest_prob):
-            dishonest_block += 1
-            if (dishonest_block >= honest_block):
-                dishonest_window = True
-        else:
-            honest_block += 1
-    if (dishonest_window):
-        dishonest_windows += 1
-print('frac:', dishonest_prob, 'w_log_base_4:', w_log, 'b_log_base_4:', b_log, 'trials:', trials, 'success_prob:', float(dishonest_windows) / float(trials))
+        phases, phase_seconds = PHASES, [0.0] * len(PHASES)
+        dishonest_windows = window_trials(dishonest_prob, PREMINE_FACTOR * w, w, b, trials, seed, phase_seconds, progress)
+    if (args.engine == 'numpy'):
+        phases, phase_seconds = race.phases, race.phase_seconds
+    for phase, phase_time in zip(phases, phase_seconds):        # summed over workers when there are several
+        reporter.add_phase(PHASE_NAMES.get(phase, phase), float(phase_time))
+    if (args.curve):
+        for b, count in enumerate(dishonest_windows, start=1):
+            reporter.result(f'frac: {dishonest_prob} w_log_base_4: {w_log} b: {b} trials: {trials} success_prob: {float(count) / float(trials)}',
+                            frac=dishonest_prob, w_log=w_log, b=b, trials=trials, success_prob=float(count) / float(trials))
+    else:
+        success_prob = float(dishonest_windows) / float(trials)
+        text = f'frac: {dishonest_prob} w_log_base_4: {w_log} b_log_base_4: {b_log} trials: {trials} success_prob: {success_prob}'
+        values = dict(frac=dishonest_prob, w_log=w_log, b=b, trials=trials, success_prob=success_prob)
+        if (args.rel_err is not None):
+            text += f' interval: {low} {high} confidence: {confidence} trials_per_sec: {trials / seconds}'
+            values.update(low=low, high=high, confidence=confidence, trials_per_sec=trials / seconds)
+        elif (args.importance):
+            rel_err = relative_error(dishonest_windows, squares, trials)
+            text += f' rel_err: {rel_err}'
+            values.update(rel_err=rel_err)
+        reporter.result(text, **values)
+    reporter.finish()
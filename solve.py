@@ -0,0 +1,62 @@
+# Finds the minimum payment depth with double spend risk at most "eps", or the largest "b" for a window of "w" blocks with FDT attack risk at most "eps",
+# for each given fraction of dishonest miners and each given "eps"
+# Usage: python3 solve.py -f 0.10:0.45:0.05 -e 1e-6,1e-9,1e-400 -d 1000000
+#        python3 solve.py -f 0.10:0.45:0.05 -e 1e-6,1e-9 -w 6
+#        python3 solve.py -f 0.01:0.49:0.01 -e 1e-6,1e-9 -d 1000000 --format csv
+
+import sys
+import argparse
+from fdts.window import Window
+from fdts.sweep import parse_range
+from decimal import Decimal
+from fdts.solve import parse_log_eps, format_eps, min_safe_depth, max_safe_b
+from fdts.report import FORMATS, Reporter
+
+
+# Main program
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Find minimum payment depth or largest b with double spend or FDT attack risk at most eps, for each fraction of dishonest miner hashpower and each eps')
+    parser.add_argument('-f', dest='fracs', help='fractions of hashpower that are dishonest, as start:stop:step or comma-separated list')
+    parser.add_argument('-e', dest='eps', help='largest acceptable risks, as comma-separated list (may be far below 1e-308, such as 1e-400)')
+    parser.add_argument('-d', dest='max_depth', help='find minimum safe depth, searching depths up to this value')
+    parser.add_argument('-w', dest='window_log', help='find largest safe b for window with this base-4 logarithm of number of blocks')
+    parser.add_argument('--format', dest='output_format', default='text', choices=FORMATS, help='output format; jsonl and csv stream one record per result, plus progress, phase timing and peak memory records (default: text)')
+    parser.add_argument('--progress-interval', dest='progress_interval', default='1.0', help='minimum seconds between progress records (default: 1.0)')
+    args = parser.parse_args()
+    if ((args.max_depth is None) == (args.window_log is None)):
+        parser.error('exactly one of -d and -w is required')
+    try:
+        fracs = parse_range(args.fracs, float)
+        log_epsilons = [parse_log_eps(eps) for eps in args.eps.split(',')]
+    except ValueError as error:
+        parser.error(str(error))
+    epsilons = [Decimal(eps) for eps in args.eps.split(',')]    # kept exact for printing, as they may underflow as floats
+    if (not all(0.0 < frac < 0.5 for frac in fracs)):
+        parser.error('fractions of dishonest hashpower must be strictly between 0 and 0.5')
+    if (args.max_depth is not None):
+        max_depth = int(args.max_depth)
+        if (max_depth < 1):
+            parser.error('maximum depth must be at least 1')
+        reporter = Reporter(args.output_format, ['frac', 'eps', 'log_eps', 'depth'], float(args.progress_interval))
+        reporter.text(f'{"frac":>5s} {"eps":>9s} {"depth":>7s}')
+        for i, frac in enumerate(fracs):
+            for eps, log_eps in zip(epsilons, log_epsilons):
+                with reporter.timing('search'):
+                    depth = min_safe_depth(frac, log_eps, max_depth)
+                reporter.result(f'{frac:5.2f} {format_eps(eps)} {depth if depth is not None else "none":>7}',
+                                frac=frac, eps=f'{eps:e}', log_eps=log_eps, depth=depth)
+            reporter.progress(i + 1, len(fracs))
+    else:
+        w_log = int(args.window_log)
+        reporter = Reporter(args.output_format, ['q', 'w_log', 'eps', 'log_eps', 'b'], float(args.progress_interval))
+        reporter.text(f'{"q":>5s} {"w_log":>5s} {"eps":>9s} {"b":>7s}')
+        for i, frac in enumerate(fracs):
+            with reporter.timing('table'):
+                window = Window(w_log, frac)
+                window.binomial.build_log_factorials()
+            for eps, log_eps in zip(epsilons, log_epsilons):
+                with reporter.timing('search'):
+                    b = max_safe_b(frac, log_eps, window)
+                reporter.result(f'{frac:5.2f} {w_log:5d} {format_eps(eps)} {b:7d}', q=frac, w_log=w_log, eps=f'{eps:e}', log_eps=log_eps, b=b)
+            reporter.progress(i + 1, len(fracs))
+    reporter.finish()
@@ -0,0 +1,63 @@
+# Calculates double spend risk (as in double_spend.py) or window risk (as in window.py) for a whole grid of values of the fraction of dishonest miners in one process
+# Usage: python3 sweep.py -f 0.01:0.49:0.01 -d 1:1000
+#        python3 sweep.py -f 0.10:0.45:0.05 -w 2:6 -b 1:64
+#        python3 sweep.py -f 0.01:0.49:0.01 -d 1:100000 --format csv
+
+import sys
+import argparse
+from fdts.sweep import LogFactorials, DoubleSpendSweep, WindowSweep, parse_range
+from fdts.report import FORMATS, Reporter
+
+
+# Main program
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Calculate double spend or window attack probabilities for a grid of fractions of dishonest miner hashpower')
+    parser.add_argument('-f', dest='fracs', help='fractions of hashpower that are dishonest, as start:stop:step or comma-separated list')
+    parser.add_argument('-d', dest='depths', help='depths of spend, as start:stop[:step] or comma-separated list')
+    parser.add_argument('-w', dest='window_logs', help='base-4 logarithms of number of blocks in window, as start:stop or comma-separated list')
+    parser.add_argument('-b', dest='bs', help='excess numbers of honest blocks in window, as start:stop[:step] or comma-separated list (default: powers of 4 up to w)')
+    parser.add_argument('--format', dest='output_format', default='text', choices=FORMATS, help='output format; jsonl and csv stream one record per result, plus progress, phase timing and peak memory records (default: text)')
+    parser.add_argument('--progress-interval', dest='progress_interval', default='1.0', help='minimum seconds between progress records (default: 1.0)')
+    args = parser.parse_args()
+    if ((args.depths is None) == (args.window_logs is None)):
+        parser.error('exactly one of -d and -w is required')
+    try:
+        fracs = parse_range(args.fracs, float)
+        depths = parse_range(args.depths, int) if (args.depths is not None) else None
+        window_logs = parse_range(args.window_logs, int) if (args.window_logs is not None) else None
+        bs = parse_range(args.bs, int) if (args.bs is not None) else None
+    except ValueError as error:
+        parser.error(str(error))
+    if (not all(0.0 < frac < 1.0 for frac in fracs)):
+        parser.error('fractions of dishonest hashpower must be strictly between 0 and 1')
+    if ((depths is not None) and (min(depths) < 1)):
+        parser.error('depths must be at least 1')
+    if ((window_logs is not None) and (min(window_logs) < 0)):
+        parser.error('base-4 logarithms of number of blocks in window must be at least 0')
+    if (depths is not None):
+        max_depth = max(depths)
+        reporter = Reporter(args.output_format, ['frac', 'depth', 'prob'], float(args.progress_interval))
+        with reporter.timing('table'):
+            log_factorials = LogFactorials(2 * max_depth)
+        with reporter.timing('summation'):
+            probs = DoubleSpendSweep(max_depth, fracs, log_factorials).calc_all_double_spends()
+        reporter.text(f'{"frac":>5s} {"depth":>7s} {"prob":>13s}')
+        for i, frac in enumerate(fracs):
+            for depth in depths:
+                reporter.result(f'{frac:5.2f} {depth:7d} {probs[i, depth - 1]:13.6e}', frac=frac, depth=depth, prob=float(probs[i, depth - 1]))
+    else:
+        reporter = Reporter(args.output_format, ['q', 'w_log', 'b', 'success_prob'], float(args.progress_interval))
+        with reporter.timing('table'):
+            log_factorials = LogFactorials(2 * 4 ** max(window_logs))
+        reporter.text(f'{"q":>5s} {"w_log":>5s} {"b":>7s} {"success_prob":>13s}')
+        for done, w_log in enumerate(window_logs, start=1):
+            w = 4 ** w_log
+            w_bs = bs if (bs is not None) else [4 ** b_log for b_log in range(w_log + 1)]
+            with reporter.timing('summation'):
+                probs = WindowSweep(w_log, fracs, log_factorials).calc_all_few_honest_probs()
+            for i, frac in enumerate(fracs):
+                for b in w_bs:
+                    if (1 <= b <= w):
+                        reporter.result(f'{frac:5.2f} {w_log:5d} {b:7d} {probs[i, b - 1]:13.6e}', q=frac, w_log=w_log, b=b, success_prob=float(probs[i, b - 1]))
+            reporter.progress(done, len(window_logs))
+    reporter.finish()
@@ -1,71 +1,50 @@
 # Calculates probability of a window of "w" consecutive blocks having fewer than "b" honest blocks, based on the fraction of dishonest miners and values of "w" and "b"
 # Usage: python3 window.py -f 0.40 -w 6
+#        python3 window.py -f 0.40 -w 6 -a --format csv
 
 import sys
 import argparse
+from fdts.window import Window
+from fdts.report import FORMATS, Reporter
 
-class Binomial(object):                                         # calculates binomial distribution probabilities
-    def __init__(self,
-                 prob,                                          # probability of success per trial
-                 max_trials):                                   # maximum number of trials
-      self.prob = prob
-      self.max_trials = max_trials
-      self.fail = 1.0 - self.prob                               # probability of failure per trial
-      self.value = [[1.0]]                                      # self.value[y][x] gives prob of exactly x successes in y trials
-      for trial in range(1, max_trials+1):
-          prev_values = self.value[trial-1]                     # values for "trial-1" trials
-          new_values = []                                       # values for "trial" trials
-          new_values.append(prev_values[0] * self.fail)         # 0 successes case
-          for successes in range(1, trial):
-              new_values.append((prev_values[successes-1] * self.prob) + (prev_values[successes] * self.fail))
-          new_values.append(prev_values[trial-1] * self.prob)   # "trial" successes case
-          self.value.append(new_values)                         # add newly-calculated values for "trial" trials
-
-    def get_value(self, successes, trials):                     # return probability of given number of successes for given number of trials
-        assert 0 <= successes <= trials
-        assert trials <= self.max_trials
-        return self.value[trials][successes]
-
-class Window(object):                                           # calculates probability of a window of a given size having fewer than "b" honest blocks given fraction of dishonest miners
-    def __init__(self,
-                 w_log,                                         # base-4 logarithm of "w", which is size of window
-                 dishonest_prob):                               # fraction of miners that are dishonest
-        self.w_log = w_log
-        self.w = 4 ** w_log
-        self.q = dishonest_prob
-        self.p = 1.0 - dishonest_prob
-        self.binomial = Binomial(self.p, 2*self.w)              # calculates binomial distribution probabilities for <= 2*w trials
-
-    def calc_few_honest_prob(self,                              # calculates probability of given window having fewer than "b" honest blocks
-                             b_log):                            # base-4 log of "b", which is excess number of honest blocks within window
-        b = 4 ** b_log
-        success_prob = 0.0                                      # probability of fewer than "b" honest blocks in window
-        # case 1: "w" honest blocks mined before "w - b + 1" dishonest blocks mined (ignoring pre-mine)
-        for k in range(self.w - b + 1):                         # number of dishonest blocks mined when w honest blocks are first mined (ignoring pre-mine)
-            binomial_prob = self.binomial.get_value(self.w - 1, self.w + k - 1)
-            pq_powers = self.q * ((self.q / self.p) ** (self.w - k - b))
-                                                                # product of powers of p and q within summation
-            success_case_prob = pq_powers
-            pq_powers = pq_powers * self.q / self.p
-            success_case_prob += (self.w - b - k + 1) * pq_powers
-            pq_powers = pq_powers * self.q / self.p
-            success_case_prob -= (self.w - b - k + 1) * pq_powers
-            success_prob += binomial_prob * success_case_prob
-        # case 2: "w - b + 1" dishonest blocks mined before "w" honest blocks mined (ignoring pre-mine)
-        for k in range(self.w):                                 # number of honest blocks mined when "w - b + 1" dishonest blocks are first mined (ignoring pre-mine)
-            binomial_prob = self.binomial.get_value(k, self.w - b + k)
-            pq_powers = self.q
-            success_prob += binomial_prob * pq_powers
-        print(f'q: {dishonest_prob:.2f} w_log_base_4: {self.w_log:2d} b_log_base_4: {b_log:2d} success_prob: {success_prob:13.6e}')
-
- 
 # Main program
-parser = argparse.ArgumentParser(description='Calculate probability of a target window of w consecutive blocks having fewer than b honest blocks based on fraction of dishonest miners and values of w and b')
-parser.add_argument('-f', dest='frac', help='fraction of hashpower that is dishonest')
-parser.add_argument('-w', dest='window_log', help='base-4 logarithm of number of blocks in window')
-args = parser.parse_args()
-dishonest_prob = float(args.frac)
-w_log = int(args.window_log)
-window = Window(w_log, dishonest_prob)
-for b_log in range(w_log+1):
-    window.calc_few_honest_prob(b_log)
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Calculate probability of a target window of w consecutive blocks having fewer than b honest blocks based on fraction of dishonest miners and values of w and b')
+    parser.add_argument('-f', dest='frac', help='fraction of hashpower that is dishonest')
+    parser.add_argument('-w', dest='window_log', help='base-4 logarithm of number of blocks in window')
+    parser.add_argument('-a', dest='all_b', action='store_true', help='print probability for every b from 1 to w, rather than for powers of 4')
+    parser.add_argument('-l', dest='log_domain', action='store_true', help='sum in log domain, which does not underflow, and also print natural log of probability')
+    parser.add_argument('--format', dest='output_format', default='text', choices=FORMATS, help='output format; jsonl and csv stream one record per result, plus progress, phase timing and peak memory records (default: text)')
+    parser.add_argument('--progress-interval', dest='progress_interval', default='1.0', help='minimum seconds between progress records (default: 1.0)')
+    args = parser.parse_args()
+    dishonest_prob = float(args.frac)
+    if ((args.log_domain) and (not 0.0 <= dishonest_prob < 0.5)):
+        parser.error('-l requires fraction of dishonest hashpower at least 0 and below 0.5')
+    w_log = int(args.window_log)
+    reporter = Reporter(args.output_format, ['q', 'w_log', 'b', 'success_prob', 'log_prob'] if (args.log_domain) else ['q', 'w_log', 'b', 'success_prob'], float(args.progress_interval))
+    with reporter.timing('table'):
+        window = Window(w_log, dishonest_prob)
+        if (args.log_domain):
+            window.binomial.build_log_factorials()
+    if (args.log_domain):
+        bs = range(1, window.w+1) if (args.all_b) else [4 ** b_log for b_log in range(w_log+1)]
+        for i, b in enumerate(bs, start=1):
+            with reporter.timing('summation'):
+                success_prob, log_prob = window.calc_log_few_honest_prob(b)
+            reporter.result(f'q: {dishonest_prob:.2f} w_log_base_4: {w_log:2d} b: {b:7d} success_prob: {success_prob:13.6e} log_prob: {log_prob:.6f}',
+                            q=dishonest_prob, w_log=w_log, b=b, success_prob=success_prob, log_prob=log_prob)
+            reporter.progress(i, len(bs))
+    elif (args.all_b):
+        with reporter.timing('summation'):
+            probs = window.calc_all_few_honest_probs()
+        for b, success_prob in enumerate(probs, start=1):
+            reporter.result(f'q: {dishonest_prob:.2f} w_log_base_4: {w_log:2d} b: {b:7d} success_prob: {success_prob:13.6e}',
+                            q=dishonest_prob, w_log=w_log, b=b, success_prob=success_prob)
+    else:
+        for b_log in range(w_log+1):
+            with reporter.timing('summation'):
+                success_prob = window.calc_few_honest_prob(4 ** b_log)
+            reporter.result(f'q: {dishonest_prob:.2f} w_log_base_4: {w_log:2d} b_log_base_4: {b_log:2d} success_prob: {success_prob:13.6e}',
+                            q=dishonest_prob, w_log=w_log, b=4 ** b_log, success_prob=success_prob)
+            reporter.progress(b_log + 1, w_log + 1)
+    reporter.finish()